@@ -0,0 +1,92 @@
+"""
+benchmark_llm2.py - Compares the single-call and parallel per-domain LLM2 analysis modes.
+Runs both modes over the same sample transcript and reports wall-clock latency and token cost.
+"""
+
+import argparse
+import statistics
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from llm_engine import llm_engine
+
+SAMPLE_HISTORY = [
+    {"role": "assistant", "content": "Hello, I'm Dr. Aiden. What brings you here today?"},
+    {"role": "user", "content": "I've been feeling really low for about two months. I just don't enjoy anything anymore."},
+    {"role": "assistant", "content": "I'm sorry you've been carrying that. How has it been affecting your sleep and your days?"},
+    {"role": "user", "content": "I sleep ten or eleven hours and still wake up exhausted. I've stopped painting and I keep cancelling on my friends."},
+    {"role": "assistant", "content": "That sounds exhausting. Did anything change in your life around the time this started?"},
+    {"role": "user", "content": "My company restructured and my new manager criticises everything I do. I keep thinking I'm useless and that I'll be fired."},
+    {"role": "assistant", "content": "That's a lot of pressure. How are things at home and with the people close to you?"},
+    {"role": "user", "content": "My partner and I argue more because they don't get why I'm so tired. Sometimes I think everyone would be better off without me."},
+]
+
+SAMPLE_CONTEXT = (
+    "Depressed mood is characterised by pervasive sadness, loss of interest or pleasure, "
+    "disturbed sleep and appetite, psychomotor change, fatigue, feelings of worthlessness, "
+    "poor concentration and recurrent thoughts of death."
+)
+
+
+def build_input():
+    return SAMPLE_HISTORY + [{"role": "user", "content": f"Clinical Context for Analysis:\n{SAMPLE_CONTEXT}\n\nPlease perform pattern analysis."}]
+
+
+def run_mode(name, fn, llm2_input, runs):
+    latencies, prompt_tokens, completion_tokens, filled = [], [], [], []
+    for i in range(runs):
+        usage = []
+        start = time.perf_counter()
+        result = fn(llm2_input, usage=usage)
+        latencies.append(time.perf_counter() - start)
+        prompt_tokens.append(sum(u["prompt_tokens"] for u in usage))
+        completion_tokens.append(sum(u["completion_tokens"] for u in usage))
+        filled.append(sum(1 for items in result.model_dump().values() if items))
+        print(f"  [{name}] run {i + 1}/{runs}: {latencies[-1]:.2f}s, {len(usage)} calls, "
+              f"{prompt_tokens[-1]} prompt + {completion_tokens[-1]} completion tokens, {filled[-1]}/6 domains filled")
+
+    return {
+        "mode": name,
+        "median_s": statistics.median(latencies),
+        "mean_s": statistics.mean(latencies),
+        "max_s": max(latencies),
+        "prompt_tokens": statistics.mean(prompt_tokens),
+        "completion_tokens": statistics.mean(completion_tokens),
+        "domains_filled": statistics.mean(filled),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM2 single vs parallel analysis")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per mode")
+    args = parser.parse_args()
+
+    print("-" * 50)
+    print(" LLM2 ANALYSIS BENCHMARK")
+    print("-" * 50)
+    print(f" Model: {llm_engine.model2}")
+
+    llm2_input = build_input()
+    results = [
+        run_mode("single", llm_engine.internal_reasoning_single, llm2_input, args.runs),
+        run_mode("parallel", llm_engine.internal_reasoning_parallel, llm2_input, args.runs),
+    ]
+
+    print("\n mode      median   mean     max      prompt_tok  completion_tok  domains")
+    for r in results:
+        print(f" {r['mode']:<9} {r['median_s']:>6.2f}s {r['mean_s']:>6.2f}s {r['max_s']:>6.2f}s "
+              f"{r['prompt_tokens']:>11.0f} {r['completion_tokens']:>15.0f} {r['domains_filled']:>8.1f}")
+
+    single, parallel = results
+    if parallel["median_s"] > 0:
+        print(f"\n Speed-up (median): {single['median_s'] / parallel['median_s']:.2f}x")
+    total_single = single["prompt_tokens"] + single["completion_tokens"]
+    total_parallel = parallel["prompt_tokens"] + parallel["completion_tokens"]
+    if total_single > 0:
+        print(f" Token cost ratio (parallel / single): {total_parallel / total_single:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
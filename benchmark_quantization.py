@@ -0,0 +1,64 @@
+"""
+benchmark_quantization.py - Measures recall loss, memory and speed of the quantized vector index.
+Compares binary and int8 first passes (+ exact float rescoring) against a brute-force float32 scan,
+using patient questions from Compumacy/Psych_data as queries.
+"""
+
+import argparse
+import random
+import statistics
+import time
+import numpy as np
+from dotenv import load_dotenv
+from langchain_huggingface import HuggingFaceEmbeddings
+from built_vectorDB import download_dataset, EMBED_MODEL
+from vector_index import QuantizedVectorIndex, VECTOR_INDEX_DIR, normalize
+from retrieval_utils import percentile
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized vector retrieval")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled queries")
+    parser.add_argument("--k", type=int, default=8, help="Results compared per query")
+    parser.add_argument("--rescore", type=int, nargs="+", default=[30, 120, 300], help="First-pass candidate counts")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    print("-" * 50)
+    print(" QUANTIZED VECTOR INDEX BENCHMARK")
+    print("-" * 50)
+
+    index = QuantizedVectorIndex.load(VECTOR_INDEX_DIR)
+    print(f" Loaded {len(index)} vectors from {VECTOR_INDEX_DIR}")
+    for name, size in index.memory_usage().items():
+        print(f"   {name:<8} {size / 1e6:8.1f} MB")
+
+    # Patient questions as queries
+    data = download_dataset()["train"]
+    questions = [q for q in data["user_message"] if q and q.strip()]
+    random.Random(args.seed).shuffle(questions)
+    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+    queries = normalize(embeddings.embed_documents(questions[:args.queries]))
+
+    # Ground truth: brute-force exact float32 top-k
+    vectors = np.asarray(index.vectors, dtype=np.float32)
+    truth = [set(np.argsort(-(vectors @ q))[:args.k].tolist()) for q in queries]
+
+    print(f"\n mode     rescore  recall@{args.k}  p50 ms  p95 ms")
+    configs = [("float32", args.k)] + [(mode, n) for mode in ("int8", "binary") for n in args.rescore]
+    for mode, rescore_k in configs:
+        recalls, latencies = [], []
+        for q, expected in zip(queries, truth):
+            start = time.perf_counter()
+            # lambda_mult=1.0 disables the diversity term so results are comparable to the exact ranking
+            rows = index.search(q, k=args.k, fetch_k=args.k, lambda_mult=1.0, mode=mode, rescore_k=rescore_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            recalls.append(len(expected & set(rows)) / args.k)
+        print(f" {mode:<8} {rescore_k:>7} {statistics.mean(recalls):>9.3f} "
+              f"{percentile(latencies, 50):>7.2f} {percentile(latencies, 95):>7.2f}")
+
+
+if __name__ == "__main__":
+    main()
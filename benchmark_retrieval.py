@@ -0,0 +1,217 @@
+"""
+benchmark_retrieval.py - Offline retrieval benchmark across chunking modes, backends and MMR parameters.
+Builds every chunking mode from create_documents_from_dataset, holds out Compumacy/Psych_data rows and
+uses their user_message as queries; the documents built from the same row are the relevant answers.
+Reports recall@k, MRR, retrieval latency percentiles, index size and build time.
+
+Latency covers the index search only; query embeddings are computed up front. Backends are local
+(exact float32, int8 / binary first pass + float rescoring, BM25, and binary + BM25 fusion); Pinecone
+is not benchmarked because it would need one cloud index per chunking mode.
+Note: "qa_pairs" documents contain the question text itself, so its scores are an upper bound.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+import numpy as np
+from dotenv import load_dotenv
+from langchain_huggingface import HuggingFaceEmbeddings
+from built_vectorDB import download_dataset, create_documents_from_dataset, EMBED_MODEL
+from lexical_index import BM25Index
+from vector_index import QuantizedVectorIndex, normalize
+from retrieval_utils import reciprocal_rank_fusion, fused_mmr, percentile
+
+load_dotenv()
+
+MODES = ["assistant_only", "qa_pairs", "both_separate"]
+BACKENDS = ["float32", "int8", "binary", "bm25", "hybrid"]
+
+
+class EmbeddingCache:
+    """Embeds each distinct text once across all chunking modes and tracks the embedding cost per text"""
+
+    def __init__(self, model_name: str):
+        self.embeddings = HuggingFaceEmbeddings(model_name=model_name)
+        self.cache: Dict[str, List[float]] = {}
+        self.embedded = 0
+        self.embed_seconds = 0.0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        missing = list(dict.fromkeys(t for t in texts if t not in self.cache))
+        if missing:
+            start = time.perf_counter()
+            vectors = self.embeddings.embed_documents(missing)
+            self.embed_seconds += time.perf_counter() - start
+            self.embedded += len(missing)
+            for text, vector in zip(missing, vectors):
+                self.cache[text] = vector
+        return np.asarray([self.cache[t] for t in texts], dtype=np.float32)
+
+    def estimated_seconds(self, n_texts: int) -> float:
+        """Time embedding n_texts would take without the cache"""
+        return n_texts * self.embed_seconds / max(self.embedded, 1)
+
+
+def run_backend(backend, vector_index, bm25, query_text, query_vec, k, fetch_k, lambda_mult):
+    if backend == "bm25":
+        return [row for row, _ in bm25.search(query_text, k=k)]
+    if backend == "hybrid":
+        # Same pipeline as RAGEngine.retrieve_documents with the local binary backend
+        dense = vector_index.candidates(query_vec, fetch_k=fetch_k, mode="binary")
+        lexical = [row for row, _ in bm25.search(query_text, k=fetch_k)]
+        fused = reciprocal_rank_fusion([dense, lexical], depth=fetch_k)
+        picked = fused_mmr([score for _, score in fused], [vector_index.vectors[row] for row, _ in fused], k, lambda_mult)
+        return [fused[i][0] for i in picked]
+    return vector_index.search(query_vec, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult, mode=backend)
+
+
+def file_size(save, suffix=""):
+    """Saves an index into a temporary location and returns its size on disk in bytes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index" + suffix)
+        save(path)
+        if os.path.isdir(path):
+            return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        return os.path.getsize(path)
+
+
+def benchmark_mode(mode, dataset, held_out, cache, queries, query_vecs, grid):
+    documents = create_documents_from_dataset(dataset, mode=mode)
+    # Held-out questions must not be indexed, otherwise the query finds itself
+    documents = [
+        doc for doc in documents
+        if not (doc.metadata["chunk_id"] in held_out and doc.metadata.get("type") == "question")
+    ]
+    relevant: Dict[int, set] = {}
+    for row, doc in enumerate(documents):
+        if doc.metadata["chunk_id"] in held_out:
+            relevant.setdefault(doc.metadata["chunk_id"], set()).add(row)
+
+    vectors = cache.embed([doc.page_content for doc in documents])
+    embed_time = cache.estimated_seconds(len(documents))
+
+    start = time.perf_counter()
+    vector_index = QuantizedVectorIndex.build(documents, vectors)
+    quantize_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bm25 = BM25Index.build(documents)
+    bm25_time = time.perf_counter() - start
+
+    memory = vector_index.memory_usage()
+    bm25_size = file_size(bm25.save, ".json.gz")
+    sizes = {
+        "float32": memory["float32"],
+        "int8": memory["int8"] + memory["float32"],      # float32 kept on disk for rescoring
+        "binary": memory["binary"] + memory["float32"],
+        "bm25": bm25_size,
+        "hybrid": memory["binary"] + memory["float32"] + bm25_size,
+    }
+    build_times = {
+        "float32": embed_time,
+        "int8": embed_time + quantize_time,
+        "binary": embed_time + quantize_time,
+        "bm25": bm25_time,
+        "hybrid": embed_time + quantize_time + bm25_time,
+    }
+    print(f" [{mode}] {len(documents)} documents, embedded in {embed_time:.1f}s, "
+          f"quantized in {quantize_time:.2f}s, BM25 built in {bm25_time:.2f}s")
+
+    results = []
+    for backend in BACKENDS:
+        seen = set()
+        for k, fetch_k, lambda_mult in grid:
+            params = (k,) if backend == "bm25" else (k, fetch_k, lambda_mult)
+            if params in seen:
+                continue
+            seen.add(params)
+
+            hits, reciprocal_ranks, latencies = [], [], []
+            for (chunk_id, text), vec in zip(queries, query_vecs):
+                if chunk_id not in relevant:
+                    continue
+                start = time.perf_counter()
+                rows = run_backend(backend, vector_index, bm25, text, vec, k, fetch_k, lambda_mult)
+                latencies.append((time.perf_counter() - start) * 1000)
+                ranks = [rank for rank, row in enumerate(rows, start=1) if row in relevant[chunk_id]]
+                hits.append(1.0 if ranks else 0.0)
+                reciprocal_ranks.append(1.0 / ranks[0] if ranks else 0.0)
+
+            results.append({
+                "mode": mode,
+                "backend": backend,
+                "k": k,
+                "fetch_k": None if backend == "bm25" else fetch_k,
+                "lambda_mult": None if backend == "bm25" else lambda_mult,
+                "queries": len(hits),
+                "recall_at_k": statistics.mean(hits) if hits else 0.0,
+                "mrr": statistics.mean(reciprocal_ranks) if reciprocal_ranks else 0.0,
+                "p50_ms": percentile(latencies, 50) if latencies else 0.0,
+                "p95_ms": percentile(latencies, 95) if latencies else 0.0,
+                "p99_ms": percentile(latencies, 99) if latencies else 0.0,
+                "index_mb": sizes[backend] / 1e6,
+                "build_s": build_times[backend],
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval across chunking modes and backends")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--queries", type=int, default=300, help="Held-out rows used as queries")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N dataset rows")
+    parser.add_argument("--k", type=int, nargs="+", default=[8])
+    parser.add_argument("--fetch-k", type=int, nargs="+", default=[30])
+    parser.add_argument("--lambda-mult", type=float, nargs="+", default=[0.5, 0.7, 1.0])
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--output", default=None, help="Write all results to this JSON file")
+    args = parser.parse_args()
+
+    print("-" * 50)
+    print(" RETRIEVAL BENCHMARK")
+    print("-" * 50)
+
+    dataset = download_dataset()
+    if args.limit:
+        dataset = {"train": dataset["train"].select(range(min(args.limit, len(dataset["train"]))))}
+    data = dataset["train"]
+
+    # Held-out queries: rows with both a question and an answer
+    candidates = [
+        idx for idx, item in enumerate(data)
+        if (item.get("user_message") or "").strip() and (item.get("assistant_message") or "").strip()
+    ]
+    held_out_rows = random.Random(args.seed).sample(candidates, min(args.queries, len(candidates)))
+    queries = [(idx, data[idx]["user_message"].strip()) for idx in held_out_rows]
+    held_out = set(held_out_rows)
+
+    cache = EmbeddingCache(EMBED_MODEL)
+    query_vecs = normalize(cache.embed([text for _, text in queries]))
+    grid = [(k, fetch_k, lam) for k, fetch_k, lam in itertools.product(args.k, args.fetch_k, args.lambda_mult) if fetch_k >= k]
+
+    results = []
+    for mode in args.modes:
+        results.extend(benchmark_mode(mode, dataset, held_out, cache, queries, query_vecs, grid))
+
+    print(f"\n {'mode':<15}{'backend':<9}{'k':>3}{'fetch':>6}{'lambda':>7}{'recall':>8}{'MRR':>7}"
+          f"{'p50ms':>8}{'p95ms':>8}{'p99ms':>8}{'MB':>9}{'build s':>9}")
+    for r in results:
+        fetch = "-" if r["fetch_k"] is None else str(r["fetch_k"])
+        lam = "-" if r["lambda_mult"] is None else f"{r['lambda_mult']:.2f}"
+        print(f" {r['mode']:<15}{r['backend']:<9}{r['k']:>3}{fetch:>6}{lam:>7}{r['recall_at_k']:>8.3f}{r['mrr']:>7.3f}"
+              f"{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}{r['p99_ms']:>8.2f}{r['index_mb']:>9.1f}{r['build_s']:>9.1f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ Handles the Compumacy/Psych_data dataset with user_message, assistant_message st
 """
 
 import os
+import uuid
 from datasets import load_dataset
 from langchain_core.documents import Document
 from langchain_pinecone import PineconeVectorStore
@@ -11,6 +12,8 @@ from langchain_huggingface import HuggingFaceEmbeddings
 from tqdm import tqdm
 from dotenv import load_dotenv
 from pinecone import Pinecone, ServerlessSpec
+from lexical_index import BM25Index, LEXICAL_INDEX_PATH
+from vector_index import QuantizedVectorIndex, VECTOR_INDEX_DIR
 
 load_dotenv()
 
@@ -88,17 +91,25 @@ def create_documents_from_dataset(dataset, mode="assistant_only"):
     print(f" Created {len(documents)} document objects.")
     return documents
 
-def build_pinecone_db(documents):
+def embed_documents(documents):
+    print(f" Initializing embedding model: {EMBED_MODEL}")
+    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+
+    print(f" Embedding {len(documents)} documents...")
+    vectors = []
+    step = BATCH_SIZE * 10
+    for start in tqdm(range(0, len(documents), step), desc="Embedding batches"):
+        batch = documents[start:start + step]
+        vectors.extend(embeddings.embed_documents([doc.page_content for doc in batch]))
+    print(f" Model dimension identified: {len(vectors[0])}")
+    return embeddings, vectors
+
+def build_pinecone_db(documents, embeddings, vectors):
     if not PINECONE_API_KEY:
         raise ValueError("PINECONE_API_KEY missing from .env")
 
     pc = Pinecone(api_key=PINECONE_API_KEY)
-    
-    # Get dimensions from model initialization
-    print(f" Initializing embedding model: {EMBED_MODEL}")
-    embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
-    test_dim = len(embeddings.embed_query("test"))
-    print(f" Model dimension identified: {test_dim}")
+    test_dim = len(vectors[0])
 
     # Create index if it doesn't exist
     if INDEX_NAME not in pc.list_indexes().names():
@@ -110,17 +121,43 @@ def build_pinecone_db(documents):
             spec=ServerlessSpec(cloud="aws", region="us-east-1")
         )
 
+    # Upload the precomputed vectors (page_content under "text", as PineconeVectorStore expects)
     print(f" Uploading batches to Pinecone...")
-    vector_store = PineconeVectorStore.from_documents(
-        documents=documents,
-        embedding=embeddings,
+    index = pc.Index(INDEX_NAME)
+    for start in tqdm(range(0, len(documents), BATCH_SIZE), desc="Uploading batches"):
+        index.upsert(vectors=[
+            {
+                "id": str(uuid.uuid4()),
+                "values": vector,
+                "metadata": {**doc.metadata, "text": doc.page_content},
+            }
+            for doc, vector in zip(documents[start:start + BATCH_SIZE], vectors[start:start + BATCH_SIZE])
+        ])
+
+    vector_store = PineconeVectorStore(
         index_name=INDEX_NAME,
+        embedding=embeddings,
         pinecone_api_key=PINECONE_API_KEY
     )
-    
+
     print(" Pinecone DB build complete!")
     return vector_store
 
+def build_vector_index(documents, vectors):
+    print(f" Building quantized vector index (float32 + int8 + binary)...")
+    index = QuantizedVectorIndex.build(documents, vectors)
+    index.save(VECTOR_INDEX_DIR)
+    sizes = ", ".join(f"{name}: {size / 1e6:.1f} MB" for name, size in index.memory_usage().items())
+    print(f" Vector index saved to {VECTOR_INDEX_DIR} ({sizes}).")
+    return index
+
+def build_lexical_index(documents):
+    print(f" Building local BM25 index over {len(documents)} documents...")
+    index = BM25Index.build(documents)
+    index.save(LEXICAL_INDEX_PATH)
+    print(f" Lexical index saved to {LEXICAL_INDEX_PATH} ({len(index.postings)} terms).")
+    return index
+
 def main():
     print("-" * 50)
     print(" PINE-PSYCH KNOWLEDGE BUILDER")
@@ -138,8 +175,17 @@ def main():
     try:
         dataset = download_dataset()
         documents = create_documents_from_dataset(dataset, mode=mode)
-        build_pinecone_db(documents)
-        print("\n✅ Success! Your knowledge base is now live on Pinecone.")
+        embeddings, vectors = embed_documents(documents)
+
+        # Local artifacts first: a DENSE_BACKEND=local deployment needs no Pinecone credentials
+        build_vector_index(documents, vectors)
+        build_lexical_index(documents)
+
+        if PINECONE_API_KEY:
+            build_pinecone_db(documents, embeddings, vectors)
+            print("\n✅ Success! Your knowledge base is now live on Pinecone.")
+        else:
+            print("\n✅ Success! Local indexes built (PINECONE_API_KEY not set, Pinecone upload skipped).")
     except Exception as e:
         print(f"\n❌ ERROR: {e}")
 
@@ -0,0 +1,155 @@
+"""
+context_compressor.py - Token-budgeted compression of retrieved clinical context for the LLM2 prompt.
+Drops near-duplicate passages, keeps the sentences most similar to the query and packs them into a token budget.
+"""
+
+import os
+import re
+import math
+import threading
+from collections import Counter
+from typing import Dict, List
+from dotenv import load_dotenv
+from langchain_core.documents import Document
+from lexical_index import tokenize
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))  # 0 disables compression
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", os.getenv("LLM2_MODEL", "meta-llama/Llama-3.3-70B-Instruct"))
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Jaccard similarity of word 3-gram shingles
+
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+
+def shingles(text: str, size: int = 3) -> set:
+    tokens = tokenize(text)
+    if len(tokens) < size:
+        return set(tokens)
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def remove_near_duplicates(texts: List[str], threshold: float = NEAR_DUPLICATE_THRESHOLD) -> List[str]:
+    """Keeps the first (highest ranked) copy of passages whose shingle overlap reaches the threshold"""
+    kept, kept_shingles = [], []
+    for text in texts:
+        sh = shingles(text)
+        if any(sh and other and len(sh & other) / len(sh | other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(text)
+        kept_shingles.append(sh)
+    return kept
+
+
+class ContextCompressor:
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, tokenizer_name: str = CONTEXT_TOKENIZER):
+        self.token_budget = token_budget
+        self.tokenizer = None
+        try:
+            from transformers import AutoTokenizer
+            # Cached next to the Whisper model so later starts load it from disk
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                tokenizer_name,
+                token=os.getenv("HUGGINGFACE_API_TOKEN"),
+                cache_dir=os.path.join(os.path.dirname(__file__), "models", "tokenizers")
+            )
+            print(f"[STARTUP DEBUG] Context tokenizer loaded: {tokenizer_name}")
+        except Exception as e:
+            print(f"WARNING: Context tokenizer {tokenizer_name} unavailable ({e}). "
+                  f"Token budgets and savings metrics are ESTIMATES (characters / 4).")
+
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "tokens_saved": 0,
+                      "estimated": self.tokenizer is None}
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer is None:
+            return math.ceil(len(text) / 4)
+        return len(self.tokenizer.encode(text, add_special_tokens=False))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if self.tokenizer is None:
+            return text[:max_tokens * 4]
+        ids = self.tokenizer.encode(text, add_special_tokens=False)[:max_tokens]
+        return self.tokenizer.decode(ids)
+
+    def _score_sentences(self, query: str, sentences: List[str]) -> List[float]:
+        # TF-IDF cosine between each sentence and the query, IDF taken over the candidate sentences
+        sentence_terms = [Counter(tokenize(s)) for s in sentences]
+        df = Counter(term for terms in sentence_terms for term in terms)
+        n = len(sentences)
+        idf = {term: math.log(1 + n / count) for term, count in df.items()}
+
+        query_vec = {t: tf * idf.get(t, math.log(1 + n)) for t, tf in Counter(tokenize(query)).items()}
+        query_norm = math.sqrt(sum(w * w for w in query_vec.values())) or 1.0
+
+        scores = []
+        for terms in sentence_terms:
+            vec = {t: tf * idf[t] for t, tf in terms.items()}
+            norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+            dot = sum(w * query_vec.get(t, 0.0) for t, w in vec.items())
+            scores.append(dot / (norm * query_norm))
+        return scores
+
+    def compress(self, query: str, documents: List[Document]) -> str:
+        texts = [doc.page_content.strip() for doc in documents if doc.page_content.strip()]
+        original = "\n\n".join(texts)
+        if self.token_budget <= 0 or not texts:
+            return original
+
+        tokens_in = self.count_tokens(original)
+        passages = remove_near_duplicates(texts)
+        deduplicated = "\n\n".join(passages)
+        if self.count_tokens(deduplicated) <= self.token_budget:
+            return self._record(len(texts), len(passages), tokens_in, deduplicated)
+
+        # (passage index, sentence index, sentence) in retrieval order
+        candidates = [
+            (p, s, sentence.strip())
+            for p, passage in enumerate(passages)
+            for s, sentence in enumerate(SENTENCE_SPLIT.split(passage))
+            if sentence.strip()
+        ]
+        scores = self._score_sentences(query, [c[2] for c in candidates])
+
+        # Greedily take the most query-similar sentences (earlier passages win ties), then fill the rest of the
+        # budget with sentences that share no terms with the query: dense retrieval may have found them by meaning.
+        # Those go in retrieval order, leading sentences of every passage first, so no passage is dropped outright.
+        matched = sorted((i for i in range(len(candidates)) if scores[i] > 0),
+                         key=lambda i: (-scores[i], candidates[i][0], candidates[i][1]))
+        unmatched = sorted((i for i in range(len(candidates)) if scores[i] <= 0),
+                           key=lambda i: (candidates[i][1], candidates[i][0]))
+        selected, used = [], 0
+        for i in matched + unmatched:
+            cost = self.count_tokens(candidates[i][2]) + 1  # + separator
+            if used + cost > self.token_budget:
+                continue
+            selected.append(i)
+            used += cost
+
+        if not selected:
+            # No sentence fits on its own (e.g. a long unpunctuated passage): keep the top-ranked passage, cut to the budget
+            compressed = self.truncate(passages[0], self.token_budget)
+            return self._record(len(texts), len(passages), tokens_in, compressed)
+
+        # Re-emit the kept sentences in their original passage and sentence order
+        grouped: Dict[int, List[str]] = {}
+        for i in sorted(selected):
+            grouped.setdefault(candidates[i][0], []).append(candidates[i][2])
+        compressed = "\n\n".join(" ".join(sentences) for sentences in grouped.values())
+
+        return self._record(len(texts), len(passages), tokens_in, compressed)
+
+    def _record(self, n_texts: int, n_passages: int, tokens_in: int, compressed: str) -> str:
+        tokens_out = self.count_tokens(compressed)
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["tokens_in"] += tokens_in
+            self.stats["tokens_out"] += tokens_out
+            self.stats["tokens_saved"] += tokens_in - tokens_out
+        unit = "estimated tokens" if self.tokenizer is None else "tokens"
+        print(f"[CONTEXT] {n_texts} passages ({n_texts - n_passages} near-duplicates dropped), "
+              f"{tokens_in} -> {tokens_out} {unit} (saved {tokens_in - tokens_out})")
+        return compressed
+
+context_compressor = ContextCompressor()
@@ -0,0 +1,121 @@
+"""
+lexical_index.py - Local BM25 inverted index over the Psych_data documents.
+Built next to the Pinecone index by built_vectorDB.py and used by RAGEngine for hybrid retrieval.
+"""
+
+import os
+import re
+import gzip
+import json
+import math
+import heapq
+from collections import Counter
+from typing import Dict, List, Tuple
+from langchain_core.documents import Document
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_index")
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", os.path.join(INDEX_DIR, "bm25_index.json.gz"))
+
+# Words kept on purpose: negations ("not", "no") and time words ("weeks", "since") carry meaning here
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "been", "but", "by", "can", "could", "do", "does",
+    "for", "from", "had", "has", "have", "he", "her", "him", "his", "how", "i", "if", "in", "into",
+    "is", "it", "its", "me", "my", "of", "on", "or", "our", "she", "so", "that", "the", "their",
+    "them", "then", "there", "these", "they", "this", "those", "to", "us", "was", "we", "were",
+    "what", "when", "which", "who", "will", "with", "would", "you", "your",
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def doc_key(doc: Document) -> str:
+    """Stable identity of a chunk shared by the Pinecone and lexical copies of a document"""
+    meta = doc.metadata or {}
+    if "chunk_id" in meta:
+        # Pinecone returns numeric metadata as floats
+        return f"{int(float(meta['chunk_id']))}:{meta.get('type', '')}"
+    return doc.page_content
+
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.texts: List[str] = []
+        self.metadatas: List[Dict] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, Tuple[List[int], List[int]]] = {}
+        self.idf: Dict[str, float] = {}
+        self.avgdl = 0.0
+
+    @classmethod
+    def build(cls, documents: List[Document], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        index = cls(k1=k1, b=b)
+        for doc_id, doc in enumerate(documents):
+            terms = Counter(tokenize(doc.page_content))
+            index.texts.append(doc.page_content)
+            index.metadatas.append(dict(doc.metadata))
+            index.doc_lengths.append(sum(terms.values()))
+            for term, tf in terms.items():
+                ids, tfs = index.postings.setdefault(term, ([], []))
+                ids.append(doc_id)
+                tfs.append(tf)
+        index._finalize()
+        return index
+
+    def _finalize(self):
+        n = len(self.doc_lengths)
+        self.avgdl = (sum(self.doc_lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            for term, (ids, _) in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.texts)
+
+    def search(self, query: str, k: int = 30) -> List[Tuple[int, float]]:
+        """Returns the top-k (doc_id, score) pairs for the query"""
+        scores: Dict[int, float] = {}
+        k1, b, avgdl, lengths = self.k1, self.b, self.avgdl or 1.0, self.doc_lengths
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            idf = self.idf[term]
+            for doc_id, tf in zip(*posting):
+                norm = tf + k1 * (1 - b + b * lengths[doc_id] / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / norm
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def document(self, doc_id: int) -> Document:
+        return Document(page_content=self.texts[doc_id], metadata=self.metadatas[doc_id])
+
+    def save(self, path: str = LEXICAL_INDEX_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        payload = {
+            "k1": self.k1,
+            "b": self.b,
+            "texts": self.texts,
+            "metadatas": self.metadatas,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings,
+        }
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f)
+
+    @classmethod
+    def load(cls, path: str = LEXICAL_INDEX_PATH) -> "BM25Index":
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        index = cls(k1=payload["k1"], b=payload["b"])
+        index.texts = payload["texts"]
+        index.metadatas = payload["metadatas"]
+        index.doc_lengths = payload["doc_lengths"]
+        index.postings = {term: (ids, tfs) for term, (ids, tfs) in payload["postings"].items()}
+        index._finalize()
+        return index
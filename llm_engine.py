@@ -1,7 +1,8 @@
 import os
 import json
 import io
-from typing import List, Literal, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from huggingface_hub import InferenceClient
@@ -330,11 +331,71 @@ You must return your analysis in this exact format:
 Remember: Your analysis guides the psychiatrist's next steps. Be thorough, precise, and clinically grounded. Every pattern you identify should be actionable for treatment planning or further exploration.
 """
 
+# Per-domain analyst prompts for the parallel LLM2 mode. Each call only fills one
+# LLM2Output field, so the prompt and the token cap can be much smaller.
+LLM2_DOMAIN_PROMPT_TEMPLATE = """
+You are a clinical pattern analyst specializing in descriptive psychopathology (Sims' Symptoms in the Mind).
+Analyze the provided conversation history and retrieved clinical context for ONE domain only: **{title}**.
+
+Look for:
+{focus}
+
+## Guidelines:
+- NEVER suggest or factor in medication or pharmacological treatment.
+- Base every item ONLY on what the patient explicitly stated or clearly implied.
+- Be specific and include duration, frequency or progression when available.
+- Flag safety concerns (suicidal ideation, self-harm, psychosis) with appropriate emphasis.
+- Return at most 6 short descriptive phrases (e.g. {example}).
+- Return an empty list if the conversation gives no evidence for this domain.
+
+## Output Structure:
+Return ONLY a JSON array of strings, for example:
+["Specific pattern 1 with context", "Specific pattern 2 with context"]
+"""
+
+LLM2_DOMAINS = {
+    "emotional_themes": {
+        "title": "Emotional themes",
+        "focus": "- Persistent mood states, emotional intensity and lability\n- Anhedonia, numbness, guilt, shame, worthlessness\n- Fear, panic, worry, emotional dysregulation",
+        "example": '"Persistent sadness lasting 3+ weeks"',
+    },
+    "thinking_patterns": {
+        "title": "Thinking patterns",
+        "focus": "- Rumination, catastrophizing, all-or-nothing thinking, negative self-talk\n- Concentration, decision making, racing or slowed thoughts, memory\n- Intrusive thoughts, suicidal ideation (note severity), distorted beliefs",
+        "example": '"Rumination about past mistakes"',
+    },
+    "behavioral_patterns": {
+        "title": "Behavioral patterns",
+        "focus": "- Sleep, appetite and weight changes, activity level\n- Withdrawal, avoidance, self-care neglect, substance use\n- Self-harm, compulsions, changes in work/school performance",
+        "example": '"Sleeping 12+ hours daily"',
+    },
+    "interpersonal_dynamics": {
+        "title": "Interpersonal dynamics",
+        "focus": "- Isolation, conflicts, dependency, fear of rejection\n- Trust, family, work/school and intimate relationships\n- Quality and availability of the support system",
+        "example": '"Withdrawing from close friends"',
+    },
+    "stressors": {
+        "title": "Stressors",
+        "focus": "- Recent life events (loss, trauma, transitions)\n- Chronic financial, work, health or relationship stressors\n- Specific triggers for symptom exacerbation",
+        "example": '"Recent job loss 3 months ago"',
+    },
+    "unclear_areas": {
+        "title": "Unclear areas (information gaps needing further exploration)",
+        "focus": "- Missing onset, duration, severity or functional impact\n- Medical, trauma, substance use, family or treatment history not discussed\n- Incomplete suicide risk assessment, unexplored cultural factors",
+        "example": '"Duration of symptoms not specified"',
+    },
+}
+
+LLM2_MODE = os.getenv("LLM2_MODE", "single")  # "single" or "parallel"
+LLM2_DOMAIN_MAX_TOKENS = int(os.getenv("LLM2_DOMAIN_MAX_TOKENS", "256"))
+LLM2_DOMAIN_TIMEOUT = float(os.getenv("LLM2_DOMAIN_TIMEOUT", "30"))
+
 class LLMEngine:
     def __init__(self):
         self.api_token = os.getenv("HUGGINGFACE_API_TOKEN")
         self.model1 = os.getenv("LLM1_MODEL", "Qwen/Qwen2.5-7B-Instruct")
         self.model2 = os.getenv("LLM2_MODEL", "meta-llama/Llama-3.3-70B-Instruct")
+        self.llm2_mode = LLM2_MODE
         
         try:
             print("[STARTUP DEBUG] Initializing Local Engines (Fast Mode)...")
@@ -373,12 +434,19 @@ class LLMEngine:
             return LLM1Output(assistant_message="I'm here. Tell me more.", intent="CONTINUE")
 
     def internal_reasoning(self, context):
+        if self.llm2_mode == "parallel":
+            return self.internal_reasoning_parallel(context)
+        return self.internal_reasoning_single(context)
+
+    def internal_reasoning_single(self, context, usage: Optional[List[Dict]] = None):
         try:
             client = InferenceClient(token=self.api_token)
             messages = [{"role": "system", "content": LLM2_SYSTEM_PROMPT}]
             for m in context:
                 messages.append({"role": m['role'], "content": m['content']})
-            raw_text = client.chat_completion(model=self.model2, messages=messages, max_tokens=1024, temperature=0.6).choices[0].message.content
+            response = client.chat_completion(model=self.model2, messages=messages, max_tokens=1024, temperature=0.6)
+            self._record_usage(usage, "all", response)
+            raw_text = response.choices[0].message.content
             start, end = raw_text.find('{'), raw_text.rfind('}') + 1
             if start != -1 and end > start:
                 try:
@@ -389,6 +457,58 @@ class LLMEngine:
             print(f"DEBUG LLM2: {e}")
             return LLM2Output()
 
+    def internal_reasoning_parallel(self, context, usage: Optional[List[Dict]] = None):
+        # Fan the six domains out as concurrent, smaller calls; a failed domain is left empty
+        with ThreadPoolExecutor(max_workers=len(LLM2_DOMAINS)) as pool:
+            futures = {
+                field: pool.submit(self._reason_domain, field, context, usage)
+                for field in LLM2_DOMAINS
+            }
+            results = {}
+            for field, future in futures.items():
+                try:
+                    results[field] = future.result()
+                except Exception as e:
+                    print(f"DEBUG LLM2 [{field}]: {e}")
+                    results[field] = []
+        return LLM2Output(**results)
+
+    def _reason_domain(self, field, context, usage=None):
+        client = InferenceClient(token=self.api_token, timeout=LLM2_DOMAIN_TIMEOUT)
+        messages = [{"role": "system", "content": LLM2_DOMAIN_PROMPT_TEMPLATE.format(**LLM2_DOMAINS[field])}]
+        for m in context:
+            messages.append({"role": m['role'], "content": m['content']})
+        response = client.chat_completion(model=self.model2, messages=messages,
+                                          max_tokens=LLM2_DOMAIN_MAX_TOKENS, temperature=0.6)
+        self._record_usage(usage, field, response)
+        raw_text = response.choices[0].message.content
+
+        start, end = raw_text.find('['), raw_text.rfind(']') + 1
+        if start != -1 and end > start:
+            try:
+                items = json.loads(raw_text[start:end])
+                return [str(item) for item in items if str(item).strip()]
+            except: pass
+        # The model occasionally answers with the full object; accept its field
+        start, end = raw_text.find('{'), raw_text.rfind('}') + 1
+        if start != -1 and end > start:
+            try:
+                return [str(item) for item in json.loads(raw_text[start:end]).get(field, [])]
+            except: pass
+        return []
+
+    @staticmethod
+    def _record_usage(usage, label, response):
+        """Appends token counts of one chat completion to `usage`, if given"""
+        if usage is None:
+            return
+        stats = getattr(response, "usage", None)
+        usage.append({
+            "call": label,
+            "prompt_tokens": getattr(stats, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(stats, "completion_tokens", 0) or 0,
+        })
+
     def transcribe_audio(self, audio_bytes: bytes):
         if self.whisper is None: return "Voice support disabled."
         try:
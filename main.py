@@ -2,15 +2,18 @@ from fastapi import FastAPI, Request, UploadFile, File, Response
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
+import asyncio
 import uuid
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 load_dotenv()
 
 from rag_engine import rag_engine
+from context_compressor import context_compressor
 from llm_engine import llm_engine
 
 app = FastAPI()
@@ -26,6 +29,7 @@ templates = Jinja2Templates(directory="templates")
 
 sessions: Dict[str, List[Dict]] = {}
 MAX_HISTORY = 100
+DISCONNECT_POLL_INTERVAL = 0.5  # seconds between client disconnect checks
 
 
 # Pydantic models for request validation
@@ -36,6 +40,96 @@ class ResetRequest(BaseModel):
 class ChatRequest(BaseModel):
     message: str
     session_id: str
+    supersede: bool = True  # a newer message replaces this session's queued ones
+
+
+class ChatTurn:
+    """One queued or running /chat_text message of a session"""
+
+    def __init__(self, key: str, message: str):
+        self.key = key
+        self.message = message
+        self.carried: List[str] = []  # messages of superseded turns, answered together with this one
+        self.waiters = 0
+        self.superseded = False
+        self.task: Optional[asyncio.Task] = None
+
+
+class SessionLane:
+    """
+    Per-session execution lane: turns of one session run one at a time in arrival order.
+    An identical message that is still queued or running is coalesced with it, and a
+    newer message can supersede the queued ones (their text is folded into the newer turn).
+    """
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.turns: Dict[str, ChatTurn] = {}  # normalized message -> queued or running turn
+        self.pending: List[ChatTurn] = []     # turns waiting for the lock, oldest first
+
+    def submit(self, session_id: str, message: str, supersede: bool) -> ChatTurn:
+        key = " ".join(message.split()).lower()
+        turn = self.turns.get(key)
+        if turn is not None and not turn.task.done():
+            turn.waiters += 1
+            return turn
+
+        turn = ChatTurn(key, message)
+        if supersede:
+            for queued in self.pending:
+                turn.carried += queued.carried + [queued.message]
+                queued.superseded = True
+                queued.task.cancel()
+                self.turns.pop(queued.key, None)
+            self.pending.clear()
+
+        turn.waiters = 1
+        self.pending.append(turn)
+        self.turns[key] = turn
+        turn.task = asyncio.create_task(self._run(session_id, turn))
+        return turn
+
+    async def _run(self, session_id: str, turn: ChatTurn):
+        try:
+            async with self.lock:
+                if turn in self.pending:
+                    self.pending.remove(turn)
+                return await process_chat_turn(session_id, turn.carried + [turn.message])
+        finally:
+            if turn in self.pending:
+                self.pending.remove(turn)
+            if self.turns.get(turn.key) is turn:
+                del self.turns[turn.key]
+
+    async def wait(self, turn: ChatTurn, http_request: Request):
+        """Waits for the turn's reply; the turn is cancelled once all its clients have disconnected"""
+        try:
+            while True:
+                done, _ = await asyncio.wait({turn.task}, timeout=DISCONNECT_POLL_INTERVAL)
+                if done:
+                    break
+                if await http_request.is_disconnected():
+                    break
+        finally:
+            turn.waiters -= 1
+            if turn.waiters == 0 and not turn.task.done():
+                turn.task.cancel()
+
+        if not turn.task.done() or turn.task.cancelled():
+            return {
+                "assistant_message": "",
+                "intent": "SUPERSEDED" if turn.superseded else "CANCELLED"
+            }
+        return turn.task.result()
+
+    def cancel_all(self):
+        for turn in list(self.turns.values()):
+            turn.task.cancel()
+        self.turns.clear()
+        self.pending.clear()
+
+
+session_lanes: Dict[str, SessionLane] = {}
 
 
 def trim_history(history):
@@ -88,13 +182,18 @@ def start_session():
 
 
 @app.post("/reset")
-def reset_session(request: ResetRequest):
+async def reset_session(request: ResetRequest):
+    # Cancel queued and in-flight turns of the old session
+    lane = session_lanes.pop(request.session_id, None)
+    if lane is not None:
+        lane.cancel_all()
+
     # Delete old session if it exists
     if request.session_id in sessions:
         del sessions[request.session_id]
 
     # Create new session
-    session_id, opening_message = create_new_session()
+    session_id, opening_message = await run_in_threadpool(create_new_session)
 
     return {
         "assistant_message": opening_message,
@@ -103,35 +202,47 @@ def reset_session(request: ResetRequest):
 
 
 @app.post("/chat_text")
-def chat_text(request: ChatRequest):
-    
-    history = sessions.get(request.session_id)
+async def chat_text(request: ChatRequest, http_request: Request):
 
-    if history is None:
-        session_id, opening_message = create_new_session()
-        history = sessions[session_id]
+    if request.session_id not in sessions:
+        session_id, opening_message = await run_in_threadpool(create_new_session)
         request.session_id = session_id
 
-    # Add user message to history
+    # Queue the message on the session's lane and wait for its reply
+    lane = session_lanes.setdefault(request.session_id, SessionLane())
+    turn = lane.submit(request.session_id, request.message, request.supersede)
+    return await lane.wait(turn, http_request)
+
+
+def commit_turn(session_id: str, user_entries: List[Dict], assistant_message: str):
+    """Appends a finished turn (user message(s) and the reply) to the session history"""
+    history = sessions.get(session_id)
+    if history is None:  # session was reset meanwhile
+        return
+    history.extend(user_entries)
     history.append({
-        "role": "user",
-        "content": request.message
+        "role": "assistant",
+        "content": assistant_message
     })
+    sessions[session_id] = trim_history(history)
+
 
-    history = trim_history(history)
-    sessions[request.session_id] = history
+async def process_chat_turn(session_id: str, messages: List[str]):
+    """
+    Runs one conversational turn. Blocking LLM and retrieval calls run in the threadpool;
+    if the turn is cancelled, the call in flight is abandoned and no further stage runs.
+    """
+    # LLM inputs are built on a copy; the session history is only updated once the turn
+    # has its reply, so a cancelled turn leaves no unanswered user message behind
+    user_entries = [{"role": "user", "content": message} for message in messages]
+    history = trim_history(sessions[session_id] + user_entries)
 
     # Get Dr. Aiden's conversational response
-    llm1_response = llm_engine.psychiatrist_response(history)
+    llm1_response = await run_in_threadpool(llm_engine.psychiatrist_response, history)
 
     # CONTINUE path (Simple chat)
     if llm1_response.intent == "CONTINUE":
-        history.append({
-            "role": "assistant",
-            "content": llm1_response.assistant_message
-        })
-        history = trim_history(history)
-        sessions[request.session_id] = history
+        commit_turn(session_id, user_entries, llm1_response.assistant_message)
 
         return {
             "assistant_message": llm1_response.assistant_message,
@@ -144,14 +255,17 @@ def chat_text(request: ChatRequest):
         recent_text = "\n".join(
             [msg["content"] for msg in history[-10:]]
         )
-        retrieved_context = rag_engine.retrieve(recent_text)
+        retrieved_docs = await run_in_threadpool(rag_engine.retrieve_documents, recent_text)
 
-        # 2. Call LLM2 (Analyst) with history and clinical context
+        # 2. Compress the retrieved passages into the LLM2 context token budget
+        retrieved_context = await run_in_threadpool(context_compressor.compress, recent_text, retrieved_docs)
+
+        # 3. Call LLM2 (Analyst) with history and clinical context
         # We wrap the context in a user message so it reaches the analyst's brain
         llm2_input = history[-10:] + [{"role": "user", "content": f"Clinical Context for Analysis:\n{retrieved_context}\n\nPlease perform pattern analysis."}]
-        llm2_response = llm_engine.internal_reasoning(llm2_input)
+        llm2_response = await run_in_threadpool(llm_engine.internal_reasoning, llm2_input)
 
-        # 3. Format the result for the internal psychiatrist briefing
+        # 4. Format the result for the internal psychiatrist briefing
         analysis_briefing = f"""[Internal Clinical Analysis - For Treatment Planning]
 
 Emotional Themes:
@@ -174,18 +288,12 @@ Areas Requiring Further Exploration:
 
 Based on this clinical insight, provide your next therapeutic response to the patient."""
 
-        # 4. Get final Dr. Aiden response based on the briefing
+        # 5. Get final Dr. Aiden response based on the briefing
         briefing_history = history + [{"role": "user", "content": analysis_briefing}]
-        llm1_final_response = llm_engine.psychiatrist_response(briefing_history)
-
-        # 5. Save the conversational outcome to history
-        history.append({
-            "role": "assistant",
-            "content": llm1_final_response.assistant_message
-        })
+        llm1_final_response = await run_in_threadpool(llm_engine.psychiatrist_response, briefing_history)
 
-        history = trim_history(history)
-        sessions[request.session_id] = history
+        # 6. Save the conversational outcome to history
+        commit_turn(session_id, user_entries, llm1_final_response.assistant_message)
 
         return {
             "assistant_message": llm1_final_response.assistant_message,
@@ -1,36 +1,143 @@
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List
 from pinecone import Pinecone
+from langchain_core.documents import Document
 from langchain_pinecone import PineconeVectorStore
 from langchain_huggingface import HuggingFaceEndpointEmbeddings
 from dotenv import load_dotenv
+from lexical_index import BM25Index, LEXICAL_INDEX_PATH, doc_key
+from vector_index import QuantizedVectorIndex, VECTOR_INDEX_DIR
+from retrieval_utils import reciprocal_rank_fusion, fused_mmr
 
 load_dotenv()
 
+DENSE_LATENCY_BUDGET = float(os.getenv("DENSE_LATENCY_BUDGET", "2.0"))  # seconds before lexical-only fallback
+DENSE_BACKEND = os.getenv("DENSE_BACKEND", "pinecone")  # "pinecone" or "local" (quantized index)
+QUANTIZED_FIRST_PASS = os.getenv("QUANTIZED_FIRST_PASS", "binary")  # "binary" or "int8"
+
+
 class RAGEngine:
     def __init__(self):
-        self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-        self.index_name = os.getenv("PINECONE_INDEX_NAME")
-        
         # Cloud-hosted Hugging Face Embeddings for Pinecone
         self.embeddings = HuggingFaceEndpointEmbeddings(
             huggingfacehub_api_token=os.getenv("HUGGINGFACE_API_TOKEN"),
             model=os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
         )
-        
-        # Load the cloud vector store directly
-        self.vectorstore = PineconeVectorStore(
-            index_name=self.index_name,
-            embedding=self.embeddings
+
+        self.dense_backend = DENSE_BACKEND
+        self.vector_index = None
+        if self.dense_backend == "local":
+            # Quantized local copy of the corpus vectors built by built_vectorDB.py
+            self.vector_index = QuantizedVectorIndex.load(VECTOR_INDEX_DIR, first_pass=QUANTIZED_FIRST_PASS)
+            print(f"[STARTUP DEBUG] Quantized vector index loaded ({len(self.vector_index)} vectors, "
+                  f"first pass: {QUANTIZED_FIRST_PASS}).")
+        else:
+            self.pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+            self.index_name = os.getenv("PINECONE_INDEX_NAME")
+
+            # Load the cloud vector store directly
+            self.vectorstore = PineconeVectorStore(
+                index_name=self.index_name,
+                embedding=self.embeddings
+            )
+
+        # Local BM25 index built by built_vectorDB.py (optional, enables hybrid retrieval)
+        self.lexical_index = None
+        if os.path.exists(LEXICAL_INDEX_PATH):
+            try:
+                self.lexical_index = BM25Index.load(LEXICAL_INDEX_PATH)
+                print(f"[STARTUP DEBUG] Lexical index loaded ({len(self.lexical_index)} docs).")
+            except Exception as e:
+                print(f"Lexical index failed to load, using dense retrieval only: {e}")
+        else:
+            print("[STARTUP DEBUG] No lexical index found, using dense retrieval only.")
+
+        # Lexical and local vector rows line up when both were built from the same documents
+        self.rows_aligned = (
+            self.vector_index is not None and self.lexical_index is not None
+            and len(self.vector_index) == len(self.lexical_index)
         )
 
-    def retrieve(self, query: str, k: int = 8, fetch_k: int = 30, lambda_mult: float = 0.7):
+        self.dense_budget = DENSE_LATENCY_BUDGET
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def _dense_search(self, query: str, k: int, fetch_k: int, lambda_mult: float) -> List[Document]:
+        if self.vector_index is not None:
+            rows = self.vector_index.search(
+                self.embeddings.embed_query(query),
+                k=k,
+                fetch_k=fetch_k,
+                lambda_mult=lambda_mult,
+                mode=QUANTIZED_FIRST_PASS
+            )
+            return [self.vector_index.document(row) for row in rows]
+
         # Using Maximal Marginal Relevance (MMR) for diverse clinical context
-        results = self.vectorstore.max_marginal_relevance_search(
-            query, 
-            k=k, 
+        return self.vectorstore.max_marginal_relevance_search(
+            query,
+            k=k,
             fetch_k=fetch_k,
             lambda_mult=lambda_mult # 0.5 to 1.0; higher means more relevance, lower means more diversity
         )
+
+    def _dense_candidates(self, query: str, fetch_k: int):
+        """Top fetch_k dense hits by similarity (no MMR) with their vectors"""
+        query_vec = self.embeddings.embed_query(query)
+        if self.vector_index is not None:
+            rows = self.vector_index.candidates(query_vec, fetch_k=fetch_k, mode=QUANTIZED_FIRST_PASS)
+            return [self.vector_index.document(row) for row in rows], [self.vector_index.vectors[row] for row in rows]
+
+        response = self.pc.Index(self.index_name).query(
+            vector=query_vec, top_k=fetch_k, include_values=True, include_metadata=True
+        )
+        docs, vectors = [], []
+        for match in response.matches:
+            metadata = dict(match.metadata or {})
+            text = metadata.pop("text", "")
+            docs.append(Document(page_content=text, metadata=metadata))
+            vectors.append(match.values)
+        return docs, vectors
+
+    def retrieve_documents(self, query: str, k: int = 8, fetch_k: int = 30, lambda_mult: float = 0.7) -> List[Document]:
+        if self.lexical_index is None:
+            return self._dense_search(query, k, fetch_k, lambda_mult)
+
+        # Dense search runs in the background while the lexical index answers locally
+        deadline = time.perf_counter() + self.dense_budget
+        dense_future = self.executor.submit(self._dense_candidates, query, fetch_k)
+        lexical_hits = self.lexical_index.search(query, k=fetch_k)
+        lexical = [self.lexical_index.document(doc_id) for doc_id, _ in lexical_hits]
+
+        try:
+            dense, dense_vectors = dense_future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except FutureTimeoutError:
+            print(f"DEBUG RAG: dense retrieval exceeded {self.dense_budget}s, answering lexical-only")
+            return lexical[:k]
+        except Exception as e:
+            print(f"DEBUG RAG: dense retrieval failed, answering lexical-only: {e}")
+            return lexical[:k]
+
+        # Fuse two similarity rankings of equal depth, then diversify the fused list with MMR
+        docs = {}
+        vectors = {}
+        for doc, vector in zip(dense, dense_vectors):
+            docs.setdefault(doc_key(doc), doc)
+            vectors.setdefault(doc_key(doc), vector)
+        for (doc_id, _), doc in zip(lexical_hits, lexical):
+            docs.setdefault(doc_key(doc), doc)
+            if self.rows_aligned:
+                vectors.setdefault(doc_key(doc), self.vector_index.vectors[doc_id])
+
+        fused = reciprocal_rank_fusion(
+            [[doc_key(doc) for doc in dense], [doc_key(doc) for doc in lexical]], depth=fetch_k
+        )
+        picked = fused_mmr([score for _, score in fused], [vectors.get(key) for key, _ in fused], k, lambda_mult)
+        return [docs[fused[i][0]] for i in picked]
+
+    def retrieve(self, query: str, k: int = 8, fetch_k: int = 30, lambda_mult: float = 0.7):
+        results = self.retrieve_documents(query, k=k, fetch_k=fetch_k, lambda_mult=lambda_mult)
         return "\n\n".join([doc.page_content for doc in results])
 
-rag_engine = RAGEngine()
\ No newline at end of file
+rag_engine = RAGEngine()
@@ -0,0 +1,57 @@
+"""
+retrieval_utils.py - Rank fusion, post-fusion MMR and metric helpers shared by RAGEngine and the benchmarks.
+Kept free of engine singletons so offline scripts can import it without connecting to any service.
+"""
+
+from typing import Hashable, List, Optional, Tuple
+import numpy as np
+
+RRF_K = 60  # reciprocal rank fusion constant
+
+
+def reciprocal_rank_fusion(rankings: List[List[Hashable]], depth: int, rrf_k: int = RRF_K) -> List[Tuple[Hashable, float]]:
+    """Fuses ranked key lists: score(d) = sum over lists of 1 / (rrf_k + rank); returns the top (key, score) pairs"""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return ranked[:depth]
+
+
+def fused_mmr(relevance: List[float], vectors: List[Optional[np.ndarray]], k: int, lambda_mult: float) -> List[int]:
+    """
+    Maximal Marginal Relevance over fused candidates: relevance is the fused score (scaled to [0, 1]),
+    redundancy the cosine similarity to already picked candidates. Candidates without a vector
+    (lexical-only hits when dense vectors are remote) are never considered redundant.
+    """
+    n = len(relevance)
+    if n == 0:
+        return []
+    rel = np.asarray(relevance, dtype=np.float32)
+    rel = rel / max(float(rel.max()), 1e-12)
+
+    dim = next((len(v) for v in vectors if v is not None), 0)
+    has_vector = np.array([v is not None for v in vectors])
+    matrix = np.zeros((n, dim), dtype=np.float32)
+    for i, v in enumerate(vectors):
+        if v is not None:
+            matrix[i] = v
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    selected = [int(np.argmax(rel))]
+    redundancy = np.zeros(n, dtype=np.float32)
+    while len(selected) < min(k, n):
+        last = selected[-1]
+        if has_vector[last]:
+            redundancy = np.maximum(redundancy, np.where(has_vector, matrix @ matrix[last], 0.0))
+        scores = lambda_mult * rel - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        selected.append(int(np.argmax(scores)))
+    return selected
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,162 @@
+"""
+vector_index.py - Local quantized copy of the corpus embeddings for fast dense retrieval.
+Keeps int8 or binary (sign bit) codes in memory for the first pass, and rescores the top
+candidates against the exact float32 vectors (memory-mapped from disk) before MMR.
+"""
+
+import os
+import gzip
+import json
+from typing import Dict, List, Tuple
+import numpy as np
+from langchain_core.documents import Document
+from lexical_index import INDEX_DIR
+
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", os.path.join(INDEX_DIR, "vectors"))
+RESCORE_MULTIPLIER = 4  # first-pass candidates kept for exact rescoring, as a multiple of fetch_k
+INT8_SCAN_BLOCK = 8192  # rows widened to float32 at a time during the int8 scan
+
+# Number of set bits in every byte value, for Hamming distance over packed codes (numpy < 2.0)
+POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-dimension scalar quantization: vectors ~= codes * scale"""
+    scale = np.abs(vectors).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.round(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+
+def quantize_binary(vectors: np.ndarray) -> np.ndarray:
+    """One sign bit per dimension, packed 8 per byte"""
+    return np.packbits(vectors > 0, axis=-1)
+
+
+def mmr(query: np.ndarray, candidates: np.ndarray, k: int, lambda_mult: float) -> List[int]:
+    """Maximal Marginal Relevance over normalized candidate vectors; returns candidate positions"""
+    if len(candidates) == 0:
+        return []
+    relevance = candidates @ query
+    selected = [int(np.argmax(relevance))]
+    redundancy = candidates @ candidates[selected[0]]
+    while len(selected) < min(k, len(candidates)):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, candidates @ candidates[best])
+    return selected
+
+
+class QuantizedVectorIndex:
+    def __init__(self, vectors: np.ndarray, int8_codes: np.ndarray, int8_scale: np.ndarray,
+                 binary_codes: np.ndarray, texts: List[str], metadatas: List[Dict]):
+        self.vectors = vectors  # float32, normalized; memory-mapped when loaded from disk
+        self.int8_codes = int8_codes
+        self.int8_scale = int8_scale
+        self.binary_codes = binary_codes
+        self.texts = texts
+        self.metadatas = metadatas
+
+    @classmethod
+    def build(cls, documents: List[Document], vectors) -> "QuantizedVectorIndex":
+        vectors = normalize(vectors)
+        int8_codes, int8_scale = quantize_int8(vectors)
+        return cls(vectors, int8_codes, int8_scale, quantize_binary(vectors),
+                   [doc.page_content for doc in documents], [dict(doc.metadata) for doc in documents])
+
+    def __len__(self):
+        return len(self.texts)
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes per loaded representation; memory-mapped float32 vectors are reported as float32_on_disk"""
+        usage = {}
+        if self.int8_codes is not None:
+            usage["int8"] = self.int8_codes.nbytes + self.int8_scale.nbytes
+        if self.binary_codes is not None:
+            usage["binary"] = self.binary_codes.nbytes
+        usage["float32_on_disk" if isinstance(self.vectors, np.memmap) else "float32"] = self.vectors.nbytes
+        return usage
+
+    def first_pass(self, query: np.ndarray, n: int, mode: str = "binary") -> np.ndarray:
+        """Approximate top-n row ids from the compact codes"""
+        n = min(n, len(self))
+        if (mode == "binary" and self.binary_codes is None) or (mode == "int8" and self.int8_codes is None):
+            raise ValueError(f"{mode} codes were not loaded for this index")
+        if mode == "binary":
+            xor = np.bitwise_xor(self.binary_codes, quantize_binary(query))
+            bits = np.bitwise_count(xor) if hasattr(np, "bitwise_count") else POPCOUNT_TABLE[xor]
+            distances = bits.sum(axis=1, dtype=np.int32)
+            candidates = np.argpartition(distances, n - 1)[:n]
+        elif mode == "int8":
+            # codes @ (scale * q) is the dot product with the dequantized vectors; scan in blocks
+            # so only one block of codes is widened at a time
+            weights = self.int8_scale * query
+            scores = np.empty(len(self), dtype=np.float32)
+            for start in range(0, len(self), INT8_SCAN_BLOCK):
+                block = self.int8_codes[start:start + INT8_SCAN_BLOCK]
+                scores[start:start + len(block)] = block.astype(np.float32) @ weights
+            candidates = np.argpartition(-scores, n - 1)[:n]
+        elif mode == "float32":
+            scores = self.vectors @ query
+            candidates = np.argpartition(-scores, n - 1)[:n]
+        else:
+            raise ValueError(f"Unknown first pass mode: {mode}")
+        return candidates
+
+    def candidates(self, query_vector, fetch_k: int = 30, mode: str = "binary", rescore_k: int = None) -> List[int]:
+        """First pass over compact codes, then exact float rescoring; returns the top fetch_k row ids by similarity"""
+        query = normalize(query_vector)
+        rows = np.sort(self.first_pass(query, rescore_k or fetch_k * RESCORE_MULTIPLIER, mode=mode))
+
+        # Exact rescoring only touches the candidate rows of the float32 matrix
+        exact = np.asarray(self.vectors[rows], dtype=np.float32)
+        top = np.argsort(-(exact @ query))[:fetch_k]
+        return rows[top].tolist()
+
+    def search(self, query_vector, k: int = 8, fetch_k: int = 30, lambda_mult: float = 0.7,
+               mode: str = "binary", rescore_k: int = None) -> List[int]:
+        """Similarity candidates (see candidates) diversified with MMR; returns row ids"""
+        rows = self.candidates(query_vector, fetch_k=fetch_k, mode=mode, rescore_k=rescore_k)
+        exact = np.asarray(self.vectors[np.asarray(rows, dtype=np.int64)], dtype=np.float32)
+        picked = mmr(normalize(query_vector), exact, k, lambda_mult)
+        return [rows[i] for i in picked]
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.texts[row], metadata=self.metadatas[row])
+
+    def save(self, directory: str = VECTOR_INDEX_DIR):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "vectors_float32.npy"), self.vectors)
+        np.save(os.path.join(directory, "vectors_int8.npy"), self.int8_codes)
+        np.save(os.path.join(directory, "int8_scale.npy"), self.int8_scale)
+        np.save(os.path.join(directory, "vectors_binary.npy"), self.binary_codes)
+        with gzip.open(os.path.join(directory, "documents.json.gz"), "wt", encoding="utf-8") as f:
+            json.dump({"texts": self.texts, "metadatas": self.metadatas}, f)
+
+    @classmethod
+    def load(cls, directory: str = VECTOR_INDEX_DIR, first_pass: str = None) -> "QuantizedVectorIndex":
+        """Loads the index; with first_pass set, only the codes that first pass needs are read into memory"""
+        with gzip.open(os.path.join(directory, "documents.json.gz"), "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+        int8_codes = int8_scale = binary_codes = None
+        if first_pass in (None, "int8"):
+            int8_codes = np.load(os.path.join(directory, "vectors_int8.npy"))
+            int8_scale = np.load(os.path.join(directory, "int8_scale.npy"))
+        if first_pass in (None, "binary"):
+            binary_codes = np.load(os.path.join(directory, "vectors_binary.npy"))
+        return cls(
+            np.load(os.path.join(directory, "vectors_float32.npy"), mmap_mode="r"),
+            int8_codes,
+            int8_scale,
+            binary_codes,
+            payload["texts"],
+            payload["metadatas"],
+        )